@@ -2,17 +2,23 @@ import numpy as np
 import random
 import math
 import matplotlib.pyplot as plt
-from scipy.io import savemat
+from scipy.io import savemat, loadmat
 import os
+import sys
+import queue
+import threading
 from skimage import data
 from skimage.color import gray2rgb
 
 # -------------------- SETTINGS --------------------
-OUTPUT_DIR = r"C:\Users\shiva\Documents\Ai_Lab_Report_MidSem\Challenging_Problem"
+OUTPUT_DIR = os.environ.get("SA_OUTPUT_DIR", os.path.dirname(os.path.abspath(__file__)))
 MAT_FILE = os.path.join(OUTPUT_DIR, "scrambled_lena.mat")
-R, C = 4, 4                  # number of rows and columns of tiles
+R, C = 4, 4                  # default rows and columns of tiles (override: python "Submission(X).py" [R C] [tiles.mat|tiles.npy])
 INIT_T, FINAL_T, COOL = 5.0, 1e-3, 0.995
 MAX_ITER, SWEEP, SAVE_PERIOD = 50000, 200, 5000
+ITER_PER_TILE = 500          # the annealing budget is max(MAX_ITER, ITER_PER_TILE * R * C) proposals
+CANDIDATES = 5               # best-matching tiles considered by guided swaps
+GREEDY_STARTS = 8            # seed tiles tried by the greedy initializer; the cheapest layout is annealed
 # --------------------------------------------------
 
 # Ensure output folder exists
@@ -37,78 +43,530 @@ def scramble_tiles(tiles):
     scrambled = [tiles[i] for i in perm]
     return scrambled, perm
 
+def as_uint8(block, scale):
+    return np.clip(np.rint(np.asarray(block, dtype=np.float32) * scale), 0, 255).astype(np.uint8)
+
 def save_mat(tiles, filename):
-    """Save tiles in .mat file."""
-    mat_dict = {"tiles": np.array(tiles)}
+    """Save tiles in .mat file as uint8."""
+    tiles = np.asarray(tiles)
+    if tiles.dtype != np.uint8:
+        tiles = as_uint8(tiles, 255.0)
+    mat_dict = {"tiles": tiles}
     savemat(filename, mat_dict)
 
+# -------------------- TILE STORE --------------------
+def uint8_store(src, dst, chunk=256):
+    """Copy a tile array into a uint8 .npy file chunk by chunk and reopen it
+    memory-mapped. Float tiles in [0, 1] are scaled to 0..255."""
+    scale = 1.0
+    if np.issubdtype(src.dtype, np.floating):
+        peak = max(float(np.max(src[s:s+chunk])) for s in range(0, len(src), chunk))
+        scale = 255.0 if peak <= 1.0 else 1.0
+    out = np.lib.format.open_memmap(dst, mode='w+', dtype=np.uint8, shape=src.shape)
+    for s in range(0, len(src), chunk):
+        out[s:s+chunk] = as_uint8(src[s:s+chunk], scale)
+    out.flush()
+    del out
+    return np.load(dst, mmap_mode='r')
+
+def load_tiles(path):
+    """Load scrambled tiles, shape (N, th, tw[, 3]), from a .npy or .mat file
+    as a read-only memory-mapped uint8 array. Anything that is not already a
+    uint8 .npy is converted once into a cache file next to the source."""
+    if os.path.getsize(path) == 0:
+        raise ValueError(f"{path} is empty")
+    cache = path + ".u8.npy"
+    if os.path.exists(cache) and os.path.getmtime(cache) >= os.path.getmtime(path):
+        return np.load(cache, mmap_mode='r')
+    if path.endswith(".npy"):
+        src = np.load(path, mmap_mode='r')
+        if src.dtype == np.uint8:
+            return src
+    elif path.endswith(".mat"):
+        # MATLAB v5 files cannot be memory-mapped, so they are read once and cached
+        mat = loadmat(path)
+        key = "tiles" if "tiles" in mat else next((k for k in mat if not k.startswith("__")), None)
+        if key is None:
+            raise ValueError(f"{path} holds no tile array")
+        src = mat[key]
+    else:
+        raise ValueError(f"unsupported tile file {path} (expected .mat or .npy)")
+    return uint8_store(src, cache)
+
+def edge_strips(tiles, depth=0):
+    """Left, right, top and bottom pixel strips of every tile, depth pixels in
+    from the border, as float64 in [0, 1]; only these are read from a
+    memory-mapped store."""
+    a, b = depth, -1 - depth
+    if isinstance(tiles, np.ndarray):
+        strips = [tiles[:, :, a], tiles[:, :, b], tiles[:, a], tiles[:, b]]
+        dtype = tiles.dtype
+    else:
+        strips = [np.stack([t[:, a] for t in tiles]), np.stack([t[:, b] for t in tiles]),
+                  np.stack([t[a] for t in tiles]), np.stack([t[b] for t in tiles])]
+        dtype = tiles[0].dtype
+    scale = 1.0 / 255.0 if dtype == np.uint8 else 1.0
+    return [np.asarray(x, dtype=np.float64) * scale for x in strips]
+
+def to_image(canvas):
+    """Canvas ready for plt.imsave: uint8 as is, floats clipped to [0, 1]."""
+    return canvas if canvas.dtype == np.uint8 else np.clip(canvas, 0, 1)
+
 # -------------------- SA RECONSTRUCTION --------------------
-def build_img(tiles, perm, R, C, shape):
+def build_img(tiles, perm, R, C, shape, out=None):
+    """Assemble the image for perm in one gather. tiles is best passed as a
+    stacked (N, th, tw, 3) array; out, if given, is reused as the canvas."""
     th, tw = shape
-    out = np.zeros((R*th, C*tw, 3), dtype=np.float32)
-    for i, t in enumerate(perm):
-        r, c = divmod(i, C)
-        out[r*th:(r+1)*th, c*tw:(c+1)*tw] = tiles[t]
+    tiles = np.asarray(tiles)
+    perm = np.asarray(perm).reshape(R, C)
+    # mode='clip' keeps the gather unbuffered, so bad indices are rejected here
+    if perm.min() < 0 or perm.max() >= len(tiles):
+        raise ValueError(f"tile index out of range 0..{len(tiles) - 1} in perm")
+    if out is None:
+        out = np.empty((R*th, C*tw) + tiles.shape[3:], dtype=tiles.dtype)
+    # view the canvas as (R, C, th, tw, ...) and gather the tiles straight into it
+    grid = out.reshape((R, th, C, tw) + tiles.shape[3:]).swapaxes(1, 2)
+    np.take(tiles, perm, axis=0, out=grid, mode='clip')
     return out
 
-def border_mse(a, b, side):
-    if side == 'r':
-        diff = a[:, -1] - b[:, 0]
-    else:
-        diff = a[-1] - b[0]
-    return np.mean(diff**2)
-
-def cost(tiles, perm, R, C):
-    s = 0
-    for i in range(R*C):
-        r, c = divmod(i, C)
-        if c < C-1:
-            s += border_mse(tiles[perm[i]], tiles[perm[i+1]], 'r')
-        if r < R-1:
-            s += border_mse(tiles[perm[i]], tiles[perm[i+C]], 'd')
+class SnapshotWriter:
+    """Background thread that builds and saves snapshot images. The queue is
+    bounded; when it is full the oldest pending snapshot is dropped so the
+    annealing loop never waits on disk I/O."""
+
+    def __init__(self, tiles, R, C, maxsize=2):
+        self.tiles, self.R, self.C = tiles, R, C
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+        self.failed = 0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, filename, perm):
+        item = (filename, list(perm))
+        while True:
+            try:
+                self.queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def _run(self):
+        buffer = None
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            filename, perm = item
+            # a failed write is reported and skipped; the thread must keep
+            # draining the queue or close() would wait on it forever
+            try:
+                buffer = build_img(self.tiles, perm, self.R, self.C, self.tiles.shape[1:3], out=buffer)
+                plt.imsave(filename, to_image(buffer))
+            except Exception as exc:
+                self.failed += 1
+                print(f"Snapshot {filename} not saved: {exc}", file=sys.stderr)
+
+    def close(self):
+        """Write what is still queued and stop the thread. Never blocks on a
+        thread that has already exited."""
+        while self.thread.is_alive():
+            try:
+                self.queue.put(None, timeout=0.1)
+                break
+            except queue.Full:
+                pass
+        self.thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def edge_matrices(tiles):
+    """N x N border dissimilarities: right[a, b] is the MSE between the right
+    edge of tile a and the left edge of tile b, down[a, b] the MSE between the
+    bottom edge of a and the top edge of b."""
+    left, right_edge, top, bottom = edge_strips(tiles)
+
+    def pairwise_mse(x, y):
+        x = x.reshape(len(x), -1)
+        y = y.reshape(len(y), -1)
+        sq = (x * x).sum(1)[:, None] + (y * y).sum(1)[None, :] - 2 * x @ y.T
+        return np.maximum(sq, 0) / x.shape[1]
+
+    right = pairwise_mse(right_edge, left)
+    down = pairwise_mse(bottom, top)
+    return right, down
+
+def prediction_matrices(tiles, chunk=64):
+    """N x N dissimilarities used to rank neighbours during greedy placement.
+    Each border is extrapolated one pixel outwards from its last two pixel
+    rows and compared (L1) with the facing border of the other tile, in both
+    directions. On small tiles this picks the true neighbour more often than
+    plain border MSE, which stays the annealing cost."""
+    if min(np.shape(tiles[0])[:2]) < 2:
+        return edge_matrices(tiles)
+    left, right_edge, top, bottom = edge_strips(tiles)
+    left_in, right_in, top_in, bottom_in = edge_strips(tiles, 1)
+
+    def pairwise_l1(x, y):
+        x = x.reshape(len(x), -1)
+        y = y.reshape(len(y), -1)
+        out = np.empty((len(x), len(y)))
+        for s in range(0, len(x), chunk):
+            out[s:s+chunk] = np.abs(x[s:s+chunk, None] - y[None]).sum(2)
+        return out
+
+    right = pairwise_l1(2*right_edge - right_in, left) + pairwise_l1(right_edge, 2*left - left_in)
+    down = pairwise_l1(2*bottom - bottom_in, top) + pairwise_l1(bottom, 2*top - top_in)
+    return right, down
+
+def cost(perm, R, C, right, down):
+    p = np.asarray(perm).reshape(R, C)
+    return right[p[:, :-1], p[:, 1:]].sum() + down[p[:-1], p[1:]].sum()
+
+def touching_cost(perm, i, R, C, right, down):
+    """Cost of the (up to four) edges around grid position i."""
+    r, c = divmod(i, C)
+    t, s = perm[i], 0.0
+    if c > 0:
+        s += right[perm[i-1], t]
+    if c < C-1:
+        s += right[t, perm[i+1]]
+    if r > 0:
+        s += down[perm[i-C], t]
+    if r < R-1:
+        s += down[t, perm[i+C]]
+    return s
+
+def region_cost(perm, positions, R, C, right, down):
+    """Cost of the edges touching any of the given positions, each counted once."""
+    inside = set(positions)
+    s = 0.0
+    for i in positions:
+        s += touching_cost(perm, i, R, C, right, down)
+        if i + 1 in inside and (i + 1) % C != 0:
+            s -= right[perm[i], perm[i+1]]
+        if i + C in inside:
+            s -= down[perm[i], perm[i+C]]
     return s
 
-def simulated_annealing(tiles, R, C):
+def swap_delta(perm, i, j, R, C, right, down):
+    """Cost change of swapping the tiles at positions i and j."""
+    before = region_cost(perm, (i, j), R, C, right, down)
+    perm[i], perm[j] = perm[j], perm[i]
+    after = region_cost(perm, (i, j), R, C, right, down)
+    perm[i], perm[j] = perm[j], perm[i]
+    return after - before
+
+def rotate(perm, positions, shift):
+    values = [perm[p] for p in positions]
+    values = values[shift:] + values[:shift]
+    for p, v in zip(positions, values):
+        perm[p] = v
+
+def random_segment(R, C):
+    """Positions of a random run of at least two tiles along a row or column."""
+    kinds = [k for k, n in (('row', C), ('col', R)) if n >= 2]
+    kind = random.choice(kinds)
+    if kind == 'row':
+        L = random.randint(2, C)
+        r, c0 = random.randrange(R), random.randint(0, C - L)
+        return [r*C + c0 + k for k in range(L)]
+    L = random.randint(2, R)
+    r0, c = random.randint(0, R - L), random.randrange(C)
+    return [(r0 + k)*C + c for k in range(L)]
+
+def random_blocks(R, C):
+    """Positions of two non-overlapping rectangles of the same random shape."""
+    while True:
+        h, w = random.randint(1, max(1, R // 2)), random.randint(1, max(1, C // 2))
+        r0, c0 = random.randint(0, R - h), random.randint(0, C - w)
+        r1, c1 = random.randint(0, R - h), random.randint(0, C - w)
+        if abs(r0 - r1) >= h or abs(c0 - c1) >= w:
+            a = [(r0 + dr)*C + c0 + dc for dr in range(h) for dc in range(w)]
+            b = [(r1 + dr)*C + c1 + dc for dr in range(h) for dc in range(w)]
+            return a, b
+
+def swap_blocks(perm, a, b):
+    vals = [perm[p] for p in a]
+    for p, q, v in zip(a, b, vals):
+        perm[p] = perm[q]
+        perm[q] = v
+
+def random_region(R, C):
+    """A random rectangle (up to the whole grid), an axis along which it has at
+    least two tiles and a cyclic shift along that axis."""
+    while True:
+        h, w = random.randint(1, R), random.randint(1, C)
+        axis = random.randrange(2)
+        size = (h, w)[axis]
+        if size >= 2:
+            r0, c0 = random.randint(0, R - h), random.randint(0, C - w)
+            return r0, r0 + h, c0, c0 + w, axis, random.randint(1, size - 1)
+
+def roll_delta(grid, region, right, down):
+    """Cost change of cyclically shifting a rectangle of the (R, C) tile grid,
+    which translates the block on one side of the cut past the other. Only the
+    window one tile beyond the rectangle is scored; edges outside it cancel.
+    Returns the change and the shifted grid."""
+    r0, r1, c0, c1, axis, shift = region
+    R, C = grid.shape
+    wr, wc = slice(max(r0 - 1, 0), min(r1 + 1, R)), slice(max(c0 - 1, 0), min(c1 + 1, C))
+    before = cost(grid[wr, wc], *grid[wr, wc].shape, right, down)
+    rolled = grid.copy()
+    rolled[r0:r1, c0:c1] = np.roll(grid[r0:r1, c0:c1], shift, axis=axis)
+    after = cost(rolled[wr, wc], *rolled[wr, wc].shape, right, down)
+    return after - before, rolled
+
+def candidate_tiles(right, down, k):
+    """The k best right and lower neighbours of every tile, as lists."""
+    r = right.copy()
+    d = down.copy()
+    np.fill_diagonal(r, np.inf)
+    np.fill_diagonal(d, np.inf)
+    k = min(k, len(r) - 1)
+    return np.argsort(r, axis=1)[:, :k].tolist(), np.argsort(d, axis=1)[:, :k].tolist()
+
+def guided_pair(perm, R, C, right_cands, down_cands):
+    """Positions i, j whose swap puts at i one of the best matches for the
+    tile left of or above i; random pairs almost never find these on large
+    grids."""
+    i = random.randrange(R * C)
+    r, c = divmod(i, C)
+    options = []
+    if c > 0:
+        options.append(right_cands[perm[i-1]])
+    if r > 0:
+        options.append(down_cands[perm[i-C]])
+    if not options:
+        return i, i
+    return i, perm.index(random.choice(random.choice(options)))
+
+# -------------------- GREEDY INITIALIZER --------------------
+def best_buddies(right, down):
+    """Best right, left, lower and upper neighbour of every tile."""
+    r = right.copy()
+    d = down.copy()
+    np.fill_diagonal(r, np.inf)
+    np.fill_diagonal(d, np.inf)
+    return r.argmin(1), r.argmin(0), d.argmin(1), d.argmin(0)
+
+def mutual_buddies(right, down):
+    """Number of sides (0-4) on which each tile and its best neighbour choose
+    each other."""
+    right_of, left_of, below_of, above_of = best_buddies(right, down)
+    idx = np.arange(len(right))
+    return ((left_of[right_of] == idx).astype(int) + (right_of[left_of] == idx)
+            + (above_of[below_of] == idx) + (below_of[above_of] == idx))
+
+def greedy_placement(right, down, R, C, seed=None):
+    """Grow the puzzle from seed (default: the tile with most mutual best
+    buddies), always filling the free slot whose best tile agrees with the
+    most placed neighbours as a best buddy (ties broken by how clearly that
+    tile beats the runner-up on mean edge MSE), while keeping the bounding box
+    within R x C."""
     N = R * C
-    perm = list(range(N))
-    random.shuffle(perm)
-    cur_cost = cost(tiles, perm, R, C)
+    right_of, left_of, below_of, above_of = best_buddies(right, down)
+    if seed is None:
+        seed = int(mutual_buddies(right, down).argmax())
+
+    grid = {(0, 0): seed}
+    placed = np.zeros(N, dtype=bool)
+    placed[seed] = True
+    box = [0, 0, 0, 0]                      # rmin, rmax, cmin, cmax
+    frontier, best = set(), {}
+
+    def fits(cell):
+        r, c = cell
+        return (max(box[1], r) - min(box[0], r) < R) and (max(box[3], c) - min(box[2], c) < C)
+
+    def score(cell):
+        r, c = cell
+        cand = np.flatnonzero(~placed)
+        total = np.zeros(len(cand))
+        buddy = np.zeros(len(cand), dtype=int)
+        count = 0
+        t = grid.get((r, c-1))
+        if t is not None:
+            total += right[t, cand]
+            buddy += (right_of[t] == cand) & (left_of[cand] == t)
+            count += 1
+        t = grid.get((r, c+1))
+        if t is not None:
+            total += right[cand, t]
+            buddy += (left_of[t] == cand) & (right_of[cand] == t)
+            count += 1
+        t = grid.get((r-1, c))
+        if t is not None:
+            total += down[t, cand]
+            buddy += (below_of[t] == cand) & (above_of[cand] == t)
+            count += 1
+        t = grid.get((r+1, c))
+        if t is not None:
+            total += down[cand, t]
+            buddy += (above_of[t] == cand) & (below_of[cand] == t)
+            count += 1
+        mean = total / count
+        k = np.lexsort((mean, -buddy))[0]
+        if len(cand) > 1:
+            second = np.partition(mean, 1)[1]
+            ratio = mean[k] / second if second > 0 else 1.0
+        else:
+            ratio = 0.0
+        return (-int(buddy[k]), ratio), int(cand[k])
+
+    def add_neighbours(r, c):
+        for cell in ((r, c-1), (r, c+1), (r-1, c), (r+1, c)):
+            if cell not in grid:
+                frontier.add(cell)
+                best.pop(cell, None)
+
+    add_neighbours(0, 0)
+    for _ in range(N - 1):
+        for cell in [cell for cell in frontier if not fits(cell)]:
+            frontier.discard(cell)
+            best.pop(cell, None)
+        for cell in frontier:
+            if cell not in best:
+                best[cell] = score(cell)
+        cell = min(frontier, key=lambda cell: best[cell][0])
+        tile = best[cell][1]
+        grid[cell] = tile
+        placed[tile] = True
+        frontier.discard(cell)
+        del best[cell]
+        r, c = cell
+        box = [min(box[0], r), max(box[1], r), min(box[2], c), max(box[3], c)]
+        # slots that wanted the tile just used must be rescored
+        for other in [o for o, (_, t) in best.items() if t == tile]:
+            del best[other]
+        add_neighbours(r, c)
+
+    perm = [0] * N
+    for (r, c), tile in grid.items():
+        perm[(r - box[0]) * C + (c - box[2])] = tile
+    return perm
+
+def simulated_annealing(tiles, R, C, init="greedy", init_t=None):
+    """Anneal with single swaps (random or guided by candidate tiles), block
+    swaps, cyclic shifts of rectangles (up to the whole grid) and row/column
+    segment rotations. init="greedy" refines the cheapest greedy placement
+    over GREEDY_STARTS seeds and both compatibility measures, starting at a
+    tenth of its mean edge cost; init="random" starts from a shuffled
+    permutation at INIT_T."""
+    N = R * C
+    right, down = edge_matrices(tiles)
+    if init == "greedy":
+        # where growth starts decides which side of the grid the layout is
+        # anchored against, so several seeds are tried; neither compatibility
+        # measure wins on every image, so both rank the neighbours in turn
+        seeds = [None] + random.sample(range(N), min(GREEDY_STARTS, N) - 1)
+        measures = [(right, down), prediction_matrices(tiles)]
+        perm = min((greedy_placement(r, d, R, C, s) for r, d in measures for s in seeds),
+                   key=lambda p: cost(p, R, C, right, down))
+        edges = max(1, R*(C-1) + (R-1)*C)
+        T0 = init_t if init_t is not None else max(0.1 * cost(perm, R, C, right, down) / edges, 1e-12)
+    else:
+        perm = list(range(N))
+        random.shuffle(perm)
+        T0 = init_t if init_t is not None else INIT_T
+    cur_cost = cost(perm, R, C, right, down)
     best_cost, best_perm = cur_cost, perm.copy()
-    T, iteration = INIT_T, 0
-
-    while T > FINAL_T and iteration < MAX_ITER:
-        for _ in range(SWEEP):
-            i, j = random.sample(range(N), 2)
-            perm[i], perm[j] = perm[j], perm[i]
-            new_cost = cost(tiles, perm, R, C)
-            if new_cost < cur_cost or random.random() < math.exp((cur_cost - new_cost)/T):
-                cur_cost = new_cost
+    T, iteration = T0, 0
+    final_t = FINAL_T * T0 / INIT_T
+    # the budget grows with the number of tiles, and cooling is scaled so
+    # that final_t is reached within it
+    budget = max(MAX_ITER, ITER_PER_TILE * N)
+    cool = min(COOL, (final_t / T0) ** (SWEEP / budget))
+    right_cands, down_cands = candidate_tiles(right, down, CANDIDATES)
+
+    # snapshots are assembled and written off the annealing thread
+    stacked = tiles if isinstance(tiles, np.ndarray) else np.stack(tiles)
+    with SnapshotWriter(stacked, R, C) as snapshots:
+        while T > final_t and iteration < budget:
+            for _ in range(SWEEP):
+                move = random.random()
+                if N > 2 and move < 0.2:
+                    a, b = random_blocks(R, C)
+                    region = a + b
+                    before = region_cost(perm, region, R, C, right, down)
+                    swap_blocks(perm, a, b)
+                    new_cost = cur_cost + region_cost(perm, region, R, C, right, down) - before
+                    if new_cost < cur_cost or random.random() < math.exp((cur_cost - new_cost)/T):
+                        cur_cost = new_cost
+                    else:
+                        swap_blocks(perm, a, b)  # revert block swap
+                elif N > 2 and move < 0.35:
+                    delta, rolled = roll_delta(np.asarray(perm).reshape(R, C), random_region(R, C), right, down)
+                    new_cost = cur_cost + delta
+                    if new_cost < cur_cost or random.random() < math.exp((cur_cost - new_cost)/T):
+                        perm[:] = rolled.ravel().tolist()
+                        cur_cost = new_cost
+                elif N > 2 and move < 0.55:
+                    seg = random_segment(R, C)
+                    shift = random.choice((1, -1))
+                    before = region_cost(perm, seg, R, C, right, down)
+                    rotate(perm, seg, shift)
+                    new_cost = cur_cost + region_cost(perm, seg, R, C, right, down) - before
+                    if new_cost < cur_cost or random.random() < math.exp((cur_cost - new_cost)/T):
+                        cur_cost = new_cost
+                    else:
+                        rotate(perm, seg, -shift)  # revert rotation
+                else:
+                    if move < 0.8:
+                        i, j = guided_pair(perm, R, C, right_cands, down_cands)
+                    else:
+                        i, j = random.sample(range(N), 2)
+                    new_cost = cur_cost + swap_delta(perm, i, j, R, C, right, down)
+                    if i != j and (new_cost < cur_cost or random.random() < math.exp((cur_cost - new_cost)/T)):
+                        perm[i], perm[j] = perm[j], perm[i]
+                        cur_cost = new_cost
                 if cur_cost < best_cost:
                     best_cost, best_perm = cur_cost, perm.copy()
-            else:
-                perm[i], perm[j] = perm[j], perm[i]  # revert swap
-            iteration += 1
+                iteration += 1
 
-            if iteration % SAVE_PERIOD == 0:
-                img_out = build_img(tiles, best_perm, R, C, tiles[0].shape[:2])
-                plt.imsave(os.path.join(OUTPUT_DIR, f"sa_out_{iteration}.png"), np.clip(img_out, 0, 1))
+                if iteration % SAVE_PERIOD == 0:
+                    snapshots.submit(os.path.join(OUTPUT_DIR, f"sa_out_{iteration}.png"), best_perm)
 
-        T *= COOL
+            T *= cool
 
     return best_perm, best_cost
 
 # -------------------- MAIN --------------------
 if __name__ == "__main__":
-    print("Creating test image...")
-    img = create_test_image()
+    args = sys.argv[1:]
+    tile_file = next((a for a in args if a.endswith((".mat", ".npy"))), None)
+    dims = [int(a) for a in args if a != tile_file]
+    if len(dims) >= 2:
+        R, C = dims[0], dims[1]
+
+    if tile_file is None:
+        print("Creating test image...")
+        img = create_test_image()
+
+        print("Tiling image...")
+        tiles, shape = tile_img(img, R, C)
 
-    print("Tiling image...")
-    tiles, shape = tile_img(img, R, C)
+        print("Scrambling tiles and saving as .mat...")
+        scrambled_tiles, perm = scramble_tiles(tiles)
+        save_mat(scrambled_tiles, MAT_FILE)
+        print(f"Saved scrambled tiles to {MAT_FILE}")
+        tile_file = MAT_FILE
 
-    print("Scrambling tiles and saving as .mat...")
-    scrambled_tiles, perm = scramble_tiles(tiles)
-    save_mat(scrambled_tiles, MAT_FILE)
-    print(f"Saved scrambled tiles to {MAT_FILE}")
+    print(f"Loading tiles from {tile_file}...")
+    scrambled_tiles = load_tiles(tile_file)
+    shape = scrambled_tiles.shape[1:3]
+    if len(dims) < 2 and len(scrambled_tiles) != R * C:
+        R = C = math.isqrt(len(scrambled_tiles))
+    if R * C != len(scrambled_tiles):
+        raise ValueError(f"{len(scrambled_tiles)} tiles do not fill a {R} x {C} grid; pass R and C")
 
     print("Running Simulated Annealing...")
     best_perm, best_cost = simulated_annealing(scrambled_tiles, R, C)
@@ -116,7 +574,7 @@ if __name__ == "__main__":
     print("Building final reconstructed image...")
     final_img = build_img(scrambled_tiles, best_perm, R, C, shape)
     final_path = os.path.join(OUTPUT_DIR, "sa_final.png")
-    plt.imsave(final_path, np.clip(final_img, 0, 1))
+    plt.imsave(final_path, to_image(final_img))
     print(f"Saved final image at {final_path}")
 
     plt.imshow(final_img)
@@ -2,6 +2,7 @@ import random
 from queue import PriorityQueue
 from dataclasses import dataclass, field
 from typing import Any, Dict, List
+from cdcl import CDCLSolver
 
 @dataclass(order=True)
 class PrioritizedEntry:
@@ -172,6 +173,23 @@ def variable_neighborhood_search(assignment: Dict[str, int], clause_size: int, v
     
     return current_state
 
+# Convert the variables/signs lists into integer clauses for the complete solver
+def to_cnf(variables: List[str], signs: List[str], clause_size: int):
+    names = sorted(set(variables))
+    index = {name: i + 1 for i, name in enumerate(names)}
+    literals = [index[var] if sign == 'P' else -index[var] for var, sign in zip(variables, signs)]
+    clauses = [literals[i:i + clause_size] for i in range(0, len(literals), clause_size)]
+    return clauses, names
+
+# Complete CDCL search: returns a satisfying assignment or None if UNSAT
+def cdcl_solve(clause_size: int, variables: List[str], signs: List[str]):
+    clauses, names = to_cnf(variables, signs, clause_size)
+    result = CDCLSolver(len(names), clauses).solve()
+    assignment = None
+    if result.status == "SAT":
+        assignment = {name: result.model[i + 1] for i, name in enumerate(names)}
+    return result.status, assignment, result.stats
+
 # Main execution flow to set up and solve the problem
 num_vars = 25
 clause_size = 3
@@ -213,3 +231,9 @@ print("First Variable Flip Neighbor: ", flip_first_variable(initial_state.copy()
 
 variable_neighborhood_solution = variable_neighborhood_search(initial_state.copy(), clause_size, variables, signs, 1000)
 print("Variable Neighborhood Search Fitness: ", assess_assignment(variable_neighborhood_solution, clause_size, variables, signs))
+
+cdcl_status, cdcl_solution, cdcl_stats = cdcl_solve(clause_size, variables, signs)
+print("CDCL Verdict: ", cdcl_status)
+if cdcl_solution is not None:
+    print("CDCL Solution Fitness: ", assess_assignment(cdcl_solution, clause_size, variables, signs))
+print("CDCL Stats: conflicts/sec = %.1f, propagations/sec = %.1f" % (cdcl_stats["conflicts_per_sec"], cdcl_stats["propagations_per_sec"]))
@@ -0,0 +1,316 @@
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+# Complete CDCL (conflict-driven clause learning) SAT solver.
+# Clauses are lists of non-zero ints in DIMACS style: +v means variable v is
+# true, -v means it is false, variables are numbered 1..num_vars.
+
+@dataclass
+class SolveResult:
+    status: str                                  # "SAT", "UNSAT" or "UNKNOWN"
+    model: Optional[Dict[int, int]] = None       # variable -> 0/1 when SAT
+    stats: Dict[str, float] = field(default_factory=dict)
+
+# Luby restart sequence: 1 1 2 1 1 2 4 1 1 2 ...
+def luby(i: int) -> int:
+    k = 1
+    while (1 << k) - 1 < i:
+        k += 1
+    while i != (1 << k) - 1:
+        i -= (1 << (k - 1)) - 1
+        k = 1
+        while (1 << k) - 1 < i:
+            k += 1
+    return 1 << (k - 1)
+
+class CDCLSolver:
+    def __init__(self, num_vars: int, clauses: List[List[int]], restart_base: int = 100, var_decay: float = 0.95):
+        self.num_vars = num_vars
+        self.restart_base = restart_base
+        self.var_decay = var_decay
+
+        self.value: List[Optional[bool]] = [None] * (num_vars + 1)
+        self.level = [0] * (num_vars + 1)
+        self.reason: List[Optional[int]] = [None] * (num_vars + 1)
+        self.phase = [False] * (num_vars + 1)
+        self.activity = [0.0] * (num_vars + 1)
+        self.var_inc = 1.0
+        # binary max-heap of variables by activity; heap_pos[v] is v's slot or -1
+        self.order_heap = list(range(1, num_vars + 1))
+        self.heap_pos = [-1] + list(range(num_vars))
+
+        self.clauses: List[List[int]] = []
+        # watches[lit] holds the clauses watching lit; visited when lit becomes false
+        self.watches: Dict[int, List[int]] = {lit: [] for v in range(1, num_vars + 1) for lit in (v, -v)}
+        self.trail: List[int] = []
+        self.trail_lim: List[int] = []
+        self.qhead = 0
+
+        self.conflicts = 0
+        self.decisions = 0
+        self.propagations = 0
+        self.restarts = 0
+        self.learned = 0
+        self.ok = True
+
+        for clause in clauses:
+            self.add_clause(clause)
+
+    def lit_value(self, lit: int) -> Optional[bool]:
+        val = self.value[abs(lit)]
+        if val is None:
+            return None
+        return val == (lit > 0)
+
+    def decision_level(self) -> int:
+        return len(self.trail_lim)
+
+    # Add an input clause; drops tautologies and duplicate literals.
+    def add_clause(self, clause: List[int]) -> None:
+        if not self.ok:
+            return
+        lits = list(dict.fromkeys(clause))
+        if any(-lit in lits for lit in lits):
+            return
+        if not lits:
+            self.ok = False
+        elif len(lits) == 1:
+            if self.lit_value(lits[0]) is False:
+                self.ok = False
+            elif self.lit_value(lits[0]) is None:
+                self.enqueue(lits[0], None)
+        else:
+            self.attach(lits)
+
+    def attach(self, lits: List[int]) -> int:
+        idx = len(self.clauses)
+        self.clauses.append(lits)
+        self.watches[lits[0]].append(idx)
+        self.watches[lits[1]].append(idx)
+        return idx
+
+    def enqueue(self, lit: int, reason: Optional[int]) -> None:
+        var = abs(lit)
+        self.value[var] = lit > 0
+        self.level[var] = self.decision_level()
+        self.reason[var] = reason
+        self.trail.append(lit)
+
+    # Two-watched-literal unit propagation. Returns a conflicting clause index or None.
+    def propagate(self) -> Optional[int]:
+        while self.qhead < len(self.trail):
+            false_lit = -self.trail[self.qhead]
+            self.qhead += 1
+            self.propagations += 1
+            watch_list = self.watches[false_lit]
+            i = 0
+            while i < len(watch_list):
+                ci = watch_list[i]
+                clause = self.clauses[ci]
+                # keep the falsified watch in slot 1
+                if clause[0] == false_lit:
+                    clause[0], clause[1] = clause[1], clause[0]
+                first = clause[0]
+                if self.lit_value(first) is True:
+                    i += 1
+                    continue
+
+                moved = False
+                for k in range(2, len(clause)):
+                    if self.lit_value(clause[k]) is not False:
+                        clause[1], clause[k] = clause[k], clause[1]
+                        self.watches[clause[1]].append(ci)
+                        watch_list[i] = watch_list[-1]
+                        watch_list.pop()
+                        moved = True
+                        break
+                if moved:
+                    continue
+
+                if self.lit_value(first) is False:
+                    return ci
+                self.enqueue(first, ci)
+                i += 1
+        return None
+
+    # First-UIP conflict analysis. Returns the learned clause (asserting literal
+    # first, highest remaining level second) and the backjump level.
+    def analyze(self, confl: int):
+        seen = [False] * (self.num_vars + 1)
+        learnt = [0]
+        counter = 0
+        lit = None
+        clause = self.clauses[confl]
+        idx = len(self.trail) - 1
+        current = self.decision_level()
+
+        while True:
+            for q in (clause if lit is None else clause[1:]):
+                var = abs(q)
+                if not seen[var] and self.level[var] > 0:
+                    seen[var] = True
+                    self.bump(var)
+                    if self.level[var] >= current:
+                        counter += 1
+                    else:
+                        learnt.append(q)
+            while not seen[abs(self.trail[idx])]:
+                idx -= 1
+            lit = self.trail[idx]
+            idx -= 1
+            seen[abs(lit)] = False
+            counter -= 1
+            if counter == 0:
+                break
+            clause = self.clauses[self.reason[abs(lit)]]
+
+        learnt[0] = -lit
+        if len(learnt) == 1:
+            return learnt, 0
+        best = max(range(1, len(learnt)), key=lambda k: self.level[abs(learnt[k])])
+        learnt[1], learnt[best] = learnt[best], learnt[1]
+        return learnt, self.level[abs(learnt[1])]
+
+    def backtrack(self, level: int) -> None:
+        if self.decision_level() <= level:
+            return
+        for lit in reversed(self.trail[self.trail_lim[level]:]):
+            var = abs(lit)
+            self.phase[var] = self.value[var]
+            self.value[var] = None
+            self.reason[var] = None
+            if self.heap_pos[var] < 0:
+                self.heap_insert(var)
+        del self.trail[self.trail_lim[level]:]
+        del self.trail_lim[level:]
+        self.qhead = len(self.trail)
+
+    # Indexed heap in the MiniSat style: each variable is in the heap at most
+    # once, and a bump moves it up in place instead of pushing a duplicate.
+    def heap_up(self, pos: int) -> None:
+        heap, act = self.order_heap, self.activity
+        var = heap[pos]
+        while pos > 0:
+            parent = (pos - 1) >> 1
+            if act[heap[parent]] >= act[var]:
+                break
+            heap[pos] = heap[parent]
+            self.heap_pos[heap[pos]] = pos
+            pos = parent
+        heap[pos] = var
+        self.heap_pos[var] = pos
+
+    def heap_down(self, pos: int) -> None:
+        heap, act = self.order_heap, self.activity
+        var = heap[pos]
+        n = len(heap)
+        while True:
+            child = 2 * pos + 1
+            if child >= n:
+                break
+            if child + 1 < n and act[heap[child + 1]] > act[heap[child]]:
+                child += 1
+            if act[heap[child]] <= act[var]:
+                break
+            heap[pos] = heap[child]
+            self.heap_pos[heap[pos]] = pos
+            pos = child
+        heap[pos] = var
+        self.heap_pos[var] = pos
+
+    def heap_insert(self, var: int) -> None:
+        self.order_heap.append(var)
+        self.heap_up(len(self.order_heap) - 1)
+
+    def heap_pop(self) -> int:
+        heap = self.order_heap
+        top = heap[0]
+        last = heap.pop()
+        self.heap_pos[top] = -1
+        if heap:
+            heap[0] = last
+            self.heap_down(0)
+        return top
+
+    # VSIDS: bump variables seen in conflicts, decay by growing the increment.
+    def bump(self, var: int) -> None:
+        self.activity[var] += self.var_inc
+        if self.activity[var] > 1e100:
+            # uniform rescale keeps the heap order intact
+            self.activity = [a * 1e-100 for a in self.activity]
+            self.var_inc *= 1e-100
+        if self.heap_pos[var] >= 0:
+            self.heap_up(self.heap_pos[var])
+
+    def decay(self) -> None:
+        self.var_inc /= self.var_decay
+
+    # Every unassigned variable is in the heap, so popping assigned ones until an
+    # unassigned one surfaces finds the most active free variable.
+    def pick_branch_var(self) -> Optional[int]:
+        while self.order_heap:
+            var = self.heap_pop()
+            if self.value[var] is None:
+                return var
+        return None
+
+    def stats(self, elapsed: float) -> Dict[str, float]:
+        per_sec = lambda n: n / elapsed if elapsed > 0 else float("inf")
+        return {
+            "time": elapsed,
+            "conflicts": self.conflicts,
+            "decisions": self.decisions,
+            "propagations": self.propagations,
+            "restarts": self.restarts,
+            "learned": self.learned,
+            "conflicts_per_sec": per_sec(self.conflicts),
+            "propagations_per_sec": per_sec(self.propagations),
+        }
+
+    def solve(self, max_conflicts: Optional[int] = None) -> SolveResult:
+        start = time.perf_counter()
+        if not self.ok or self.propagate() is not None:
+            self.ok = False
+            return SolveResult("UNSAT", None, self.stats(time.perf_counter() - start))
+
+        restart_limit = self.restart_base * luby(1)
+        since_restart = 0
+
+        while True:
+            confl = self.propagate()
+            if confl is not None:
+                self.conflicts += 1
+                since_restart += 1
+                if self.decision_level() == 0:
+                    self.ok = False
+                    return SolveResult("UNSAT", None, self.stats(time.perf_counter() - start))
+                learnt, back_level = self.analyze(confl)
+                self.backtrack(back_level)
+                if len(learnt) == 1:
+                    self.enqueue(learnt[0], None)
+                else:
+                    self.enqueue(learnt[0], self.attach(learnt))
+                self.learned += 1
+                self.decay()
+                continue
+
+            if max_conflicts is not None and self.conflicts >= max_conflicts:
+                self.backtrack(0)
+                return SolveResult("UNKNOWN", None, self.stats(time.perf_counter() - start))
+
+            if since_restart >= restart_limit:
+                self.backtrack(0)
+                self.restarts += 1
+                since_restart = 0
+                restart_limit = self.restart_base * luby(self.restarts + 1)
+                continue
+
+            var = self.pick_branch_var()
+            if var is None:
+                model = {v: int(self.value[v]) for v in range(1, self.num_vars + 1)}
+                self.backtrack(0)
+                return SolveResult("SAT", model, self.stats(time.perf_counter() - start))
+            self.decisions += 1
+            self.trail_lim.append(len(self.trail))
+            self.enqueue(var if self.phase[var] else -var, None)
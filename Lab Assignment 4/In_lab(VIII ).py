@@ -1,42 +1,32 @@
 from random import random
-from simulated_annealing import SimAnneal
-import numpy as np
+from simulated_annealing import SimAnneal, MATRIX_LIMIT
+from tsplib import read_tsp
+from parallel_tempering import ParallelTempering
 import time
 
-
-def tsp_read(nodes):
-    infile = open(nodes, 'r')
-    content = infile.readline().strip().split()
-    print("File Name: ", content[2])
-
-    while content[0] != 'NODE_COORD_SECTION':
-        if(content[0] == 'DIMENSION'):
-            dimension = content[2]
-        content = infile.readline().strip().split()
-    nodelist = []
-    placelist = []
-    print('Dimension', dimension)
-    N = int(dimension)
-    for i in range(0, N):
-        x, y, z = infile.readline().strip().split()[:]
-        nodelist.append([float(y), float(z)])
-        placelist.append(x)
-
-    # Close input file
-    infile.close()
-    return nodelist, placelist
+# Number of parallel-tempering replicas; 0 runs the single annealing chain.
+REPLICAS = 0
 
 
 def main():
     # generate_random_coords(100)
-    nodes, place = tsp_read("Data/rajasthan.tsp")
-    coords = np.array(nodes)
-    n = len(coords)
+    instance = read_tsp("Data/rajasthan.tsp", max_matrix=MATRIX_LIMIT)
+    print("File Name: ", instance.name)
+    print('Dimension', instance.dimension)
+    if instance.coords is None:
+        raise ValueError("SimAnneal needs node coordinates (NODE_COORD_SECTION or DISPLAY_DATA_SECTION)")
+    n = instance.dimension
     start = time.time_ns()
-    sa = SimAnneal(coords, place, stopping_iter=n*10000000)
+    sa = SimAnneal(instance.coords, instance.names, stopping_iter=n*10000000,
+                   dist_matrix=instance.dist_matrix, metric=instance.metric)
     end = time.time_ns()
     print('Execution Time', end-start)
-    sa.simulated_annealing()
+    if REPLICAS:
+        pt = ParallelTempering(sa, replicas=REPLICAS)
+        pt.run()
+        pt.report()
+    else:
+        sa.simulated_annealing()
     sa.display_optimal_path()
     sa.animateSolutions()
     sa.plot_learning()
@@ -1,35 +1,76 @@
+import numpy as np
 import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
+from multiprocessing import Process
+from matplotlib.animation import FuncAnimation, FFMpegWriter, PillowWriter
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 
 
-def animateTSP(history, points):
+# Evenly spaced history indices, at most target_frames of them (first and
+# last always included).
+def frame_indices(n_history, target_frames):
+    if n_history == 0:
+        return np.empty(0, dtype=np.int64)
+    count = max(1, min(target_frames, n_history))
+    return np.unique(np.linspace(0, n_history - 1, count).round().astype(np.int64))
 
-    key_frames_mult = len(history) // 1500
 
-    fig, ax = plt.subplots()
+# Closed-tour coordinates for the chosen frames, shape (F, N + 1, 2), built with
+# one fancy-indexing pass instead of per-point lookups.
+def tour_coordinates(history, points, frames):
+    if len(frames) == 0:
+        raise ValueError("no history recorded; use a HistoryRecorder mode other than 'off'")
+    tours = np.stack([np.asarray(history[int(f)]) for f in frames])
+    tours = np.concatenate([tours, tours[:, :1]], axis=1)
+    return np.asarray(points)[tours]
 
-    line, = plt.plot([], [], lw=2)
 
-    def init():
-        x = [points[i][0] for i in history[0]]
-        y = [points[i][1] for i in history[0]]
-        plt.plot(x, y, 'co')
-
-        extra_x = (max(x) - min(x)) * 0.05
-        extra_y = (max(y) - min(y)) * 0.05
-        ax.set_xlim(min(x) - extra_x, max(x) + extra_x)
-        ax.set_ylim(min(y) - extra_y, max(y) + extra_y)
+def _setup(fig, xy):
+    ax = fig.add_subplot()
+    cities = xy[0, :-1]
+    ax.plot(cities[:, 0], cities[:, 1], 'co')
+    low, high = cities.min(axis=0), cities.max(axis=0)
+    extra = (high - low) * 0.05
+    ax.set_xlim(low[0] - extra[0], high[0] + extra[0])
+    ax.set_ylim(low[1] - extra[1], high[1] + extra[1])
+    line, = ax.plot([], [], lw=2)
 
+    def init():
         line.set_data([], [])
         return line,
 
     def update(frame):
-        x = [points[i, 0] for i in history[frame] + [history[frame][0]]]
-        y = [points[i, 1] for i in history[frame] + [history[frame][0]]]
-        line.set_data(x, y)
-        return line
+        line.set_data(xy[frame, :, 0], xy[frame, :, 1])
+        return line,
+
+    return init, update
 
-    ani = FuncAnimation(fig, update, frames=range(
-        0, len(history), key_frames_mult), init_func=init, interval=3, repeat=False)
 
+def animateTSP(history, points, target_frames=1500, interval=3):
+    xy = tour_coordinates(history, points, frame_indices(len(history), target_frames))
+    fig = plt.figure()
+    init, update = _setup(fig, xy)
+    ani = FuncAnimation(fig, update, frames=len(xy), init_func=init, interval=interval, blit=True, repeat=False)
     plt.show()
+    return ani
+
+
+# Write precomputed frames to MP4 (ffmpeg) or GIF (Pillow) on an Agg canvas,
+# so no display or pyplot backend is needed.
+def render_frames(xy, filename, fps=30, dpi=100):
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    init, update = _setup(fig, xy)
+    ani = FuncAnimation(fig, update, frames=len(xy), init_func=init, blit=True, repeat=False)
+    writer = PillowWriter(fps=fps) if filename.lower().endswith(".gif") else FFMpegWriter(fps=fps)
+    ani.save(filename, writer=writer, dpi=dpi)
+
+
+def renderTSP(history, points, filename, target_frames=300, fps=30, dpi=100, background=False):
+    xy = tour_coordinates(history, points, frame_indices(len(history), target_frames))
+    if not background:
+        render_frames(xy, filename, fps, dpi)
+        return None
+    process = Process(target=render_frames, args=(xy, filename, fps, dpi))
+    process.start()
+    return process
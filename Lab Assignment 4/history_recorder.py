@@ -0,0 +1,153 @@
+import random
+import numpy as np
+
+
+MODES = ("off", "every", "improvement", "reservoir")
+META = np.dtype([("iteration", np.int64), ("cost", np.float64)])
+
+
+class HistoryRecorder():
+    """Bounded record of the tours visited by SimAnneal.
+
+    mode "off" keeps nothing, "every" keeps every k-th iteration,
+    "improvement" keeps tours that beat the best recorded cost and
+    "reservoir" keeps a uniform sample of at most `capacity` tours. The
+    first recorded tour is always kept. The reservoir (and the initial
+    buffer of the other modes) holds at most `budget` bytes of tours, so
+    it keeps fewer tours on large instances. When `path` is given, tours
+    are written as int32 rows to that file, and iterations and costs to
+    `path + ".meta"`, and read back through np.memmap.
+    """
+
+    def __init__(self, mode="every", k=1, capacity=1500, path=None, budget=64 * 2**20):
+        if mode not in MODES:
+            raise ValueError("mode must be one of %s, got %r" % (MODES, mode))
+        if k < 1 or capacity < 1 or budget < 1:
+            raise ValueError("k, capacity and budget must be positive")
+        self.mode = mode
+        self.k = k
+        self.capacity = capacity
+        self.budget = budget
+        self.path = path
+        self.seen = 0
+        self.best = float("Inf")
+        self._meta = None
+        self._tours = None
+        self._file = None
+        self._meta_file = None
+        self._count = 0
+        self._n = 0
+        self._order = None
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        return self.tours()[self.order()[i]]
+
+# Store a tour if the recording mode selects it.
+    def record(self, iteration, path, cost):
+        if self.mode == "off":
+            return
+        self.seen += 1
+        first = self.seen == 1
+        if self.mode == "every" and not first and iteration % self.k != 0:
+            return
+        if self.mode == "improvement":
+            if not first and cost >= self.best:
+                return
+            self.best = cost
+
+        if self.mode == "reservoir" and self._count >= self.capacity:
+            # Algorithm R over everything after the pinned first tour
+            r = random.randrange(self.seen - 1)
+            if r >= self.capacity - 1:
+                return
+            slot = r + 1
+            self._tours[slot] = path
+            self._meta[slot] = (iteration, cost)
+        else:
+            self._append(path, iteration, cost)
+        self._order = None
+
+# Rows of N int32 that fit in the memory budget (at least one).
+    def _budget_rows(self):
+        return max(1, self.budget // (4 * self._n))
+
+    def _append(self, path, iteration, cost):
+        row = np.asarray(path, dtype=np.int32)
+        if self._tours is None and self._file is None:
+            self._n = len(row)
+            if self.mode == "reservoir":
+                self.capacity = min(self.capacity, self._budget_rows())
+                rows = self.capacity
+            else:
+                rows = min(1024, self._budget_rows())
+            self._meta = np.empty(rows, dtype=META)
+            if self.path is None:
+                self._tours = np.empty((rows, self._n), dtype=np.int32)
+            elif self.mode == "reservoir":
+                self._tours = np.memmap(self.path, dtype=np.int32, mode="w+", shape=(rows, self._n))
+            else:
+                self._file = open(self.path, "wb")
+                self._meta_file = open(self.path + ".meta", "wb")
+                self._meta = None
+
+        if self._file is not None:
+            self._file.write(row.tobytes())
+            self._meta_file.write(np.array((iteration, cost), dtype=META).tobytes())
+            self._tours = self._meta = None
+        else:
+            if self._count == len(self._tours):
+                grown = np.empty((2 * len(self._tours), self._n), dtype=np.int32)
+                grown[:self._count] = self._tours
+                self._tours = grown
+                self._meta = np.resize(self._meta, 2 * len(self._meta))
+            self._tours[self._count] = row
+            self._meta[self._count] = (iteration, cost)
+        self._count += 1
+
+# All stored tours in storage order; memory-mapped when streaming to a file.
+    def tours(self):
+        if self._file is not None:
+            if self._tours is None or len(self._tours) < self._count:
+                if not self._file.closed:
+                    self._file.flush()
+                self._tours = np.memmap(self.path, dtype=np.int32, mode="r", shape=(self._count, self._n))
+            return self._tours
+        if self._tours is None:
+            return np.empty((0, 0), dtype=np.int32)
+        return self._tours[:self._count]
+
+# (iteration, cost) of each stored tour in storage order.
+    def meta(self):
+        if self._meta_file is not None:
+            if self._meta is None or len(self._meta) < self._count:
+                if not self._meta_file.closed:
+                    self._meta_file.flush()
+                self._meta = np.memmap(self.path + ".meta", dtype=META, mode="r", shape=(self._count,))
+            return self._meta
+        if self._meta is None:
+            return np.empty(0, dtype=META)
+        return self._meta[:self._count]
+
+# Storage index of each stored tour, sorted by iteration.
+    def order(self):
+        if self._order is None:
+            self._order = np.argsort(self.meta()["iteration"], kind="stable")
+        return self._order
+
+    @property
+    def iterations(self):
+        return np.asarray(self.meta()["iteration"])[self.order()]
+
+    @property
+    def costs(self):
+        return np.asarray(self.meta()["cost"])[self.order()]
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._meta_file.close()
+        if isinstance(self._tours, np.memmap):
+            self._tours.flush()
@@ -0,0 +1,118 @@
+import math
+import os
+import random
+import numpy as np
+from multiprocessing import Pool
+from history_recorder import HistoryRecorder
+from simulated_annealing import SimAnneal
+
+
+# Each worker process keeps one SimAnneal chain sharing the parent's distances
+# and candidate lists; tours are shipped in and out every round.
+_chain = None
+
+
+def _init_worker(coords, dist_matrix, metric, candidates):
+    global _chain
+    _chain = SimAnneal(coords, None, stopping_iter=0, history=HistoryRecorder("off"),
+                       neighbors=0, dist_matrix=dist_matrix, metric=metric)
+    _chain.candidates = candidates
+
+
+def _replica_sweep(task):
+    path, cost, temp, steps, seed = task
+    random.seed(seed)
+    _chain.temp = temp
+    _chain.set_state(path, cost)
+    _chain.best_cost, _chain.best_path = cost, list(path)
+    accepted = _chain.metropolis(steps)
+    return _chain.current_path, _chain.current_cost, accepted, _chain.best_path, _chain.best_cost
+
+
+class ParallelTempering():
+    """Replica-exchange annealing for a configured SimAnneal instance.
+
+    One replica per temperature on a geometric ladder runs `sweep`
+    Metropolis steps per round in a worker process. Between rounds
+    neighbouring replicas swap tours with probability
+    min(1, exp((1/T_i - 1/T_j) * (E_i - E_j))), alternating even and odd
+    pairs, and the coldest replica is reset to the global best when it
+    has drifted above it. Results are written back to the SimAnneal.
+    """
+
+    def __init__(self, sa, replicas=None, rounds=200, sweep=2000, t_min=None, t_max=None, processes=None, seed=None,
+                 hot_accept=0.5, cold_accept=0.05):
+        self.sa = sa
+        self.replicas = replicas or os.cpu_count() or 1
+        self.rounds = rounds
+        self.sweep = sweep
+        self.t_min = t_min
+        self.t_max = t_max
+        self.hot_accept = hot_accept
+        self.cold_accept = cold_accept
+        self.processes = processes or min(self.replicas, os.cpu_count() or 1)
+        self.rng = random.Random(seed)
+        self.temps = None
+        self.accept_rates = None
+        self.swap_rates = None
+
+# Geometric ladder. The default range comes from sampled uphill moves of
+# the starting tour, as in SimAnneal.calibrate_temperature: the hottest
+# replica accepts about hot_accept of them, the coldest about cold_accept.
+    def ladder(self):
+        t_max = self.t_max if self.t_max is not None else self.sa.calibrate_temperature(target=self.hot_accept)
+        t_min = self.t_min if self.t_min is not None else self.sa.calibrate_temperature(target=self.cold_accept)
+        if self.replicas == 1:
+            return [t_min]
+        ratio = (t_max / t_min) ** (1.0 / (self.replicas - 1))
+        return [t_min * ratio ** k for k in range(self.replicas)]
+
+    def run(self):
+        sa = self.sa
+        path, cost = sa.intial_solution()
+        sa.set_state(path, cost)
+        self.temps = self.ladder()
+        states = [(list(path), cost) for _ in self.temps]
+        accepted = np.zeros(len(self.temps))
+        swaps_tried = np.zeros(max(len(self.temps) - 1, 0))
+        swaps_done = np.zeros(max(len(self.temps) - 1, 0))
+        best_path, best_cost = list(path), cost
+
+        initargs = (sa.coords, sa.dist_matrix, sa.metric, sa.candidates)
+        with Pool(self.processes, initializer=_init_worker, initargs=initargs) as pool:
+            for rnd in range(self.rounds):
+                tasks = [(p, c, t, self.sweep, self.rng.getrandbits(32)) for (p, c), t in zip(states, self.temps)]
+                results = pool.map(_replica_sweep, tasks)
+                states = []
+                for k, (p, c, acc, bp, bc) in enumerate(results):
+                    states.append((p, c))
+                    accepted[k] += acc
+                    if bc < best_cost:
+                        best_path, best_cost = bp, bc
+
+                for k in range(rnd % 2, len(self.temps) - 1, 2):
+                    swaps_tried[k] += 1
+                    (_, e_cold), (_, e_hot) = states[k], states[k + 1]
+                    x = (1.0 / self.temps[k] - 1.0 / self.temps[k + 1]) * (e_cold - e_hot)
+                    if x >= 0 or self.rng.random() < math.exp(x):
+                        states[k], states[k + 1] = states[k + 1], states[k]
+                        swaps_done[k] += 1
+
+                if states[0][1] > best_cost:
+                    states[0] = (list(best_path), best_cost)
+                sa.iteration += self.sweep
+                sa.history.record(sa.iteration, best_path, best_cost)
+
+        sa.best_path, sa.best_cost = best_path, best_cost
+        sa.set_state(*states[0])
+        self.accept_rates = accepted / (self.rounds * self.sweep)
+        self.swap_rates = np.divide(swaps_done, swaps_tried, out=np.zeros_like(swaps_done), where=swaps_tried > 0)
+        print("Best cost obtained:", best_cost)
+        return best_path, best_cost
+
+    def report(self):
+        for k, t in enumerate(self.temps):
+            line = "T = %-12.6g acceptance = %.3f" % (t, self.accept_rates[k])
+            if k < len(self.swap_rates):
+                line += "   swap %d<->%d = %.3f" % (k, k + 1, self.swap_rates[k])
+            print(line)
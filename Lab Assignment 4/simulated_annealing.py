@@ -1,97 +1,274 @@
 import math
 import random
+import numpy as np
 import matplotlib.pyplot as plt
 import animated_visualizer
+from history_recorder import HistoryRecorder
+from spatial_index import SpatialIndex
+from lower_bound import held_karp_bound
+
+# Above this many cities distances are computed on demand instead of
+# holding an N x N matrix.
+MATRIX_LIMIT = 5000
 
 
 class SimAnneal():
-    def __init__(self, coordinates, place, stopping_iter, N=-1, nodes=-1, temp=-1, stopping_temperature=-1):
-        self.coords = coordinates
+    def __init__(self, coordinates, place, stopping_iter, N=-1, nodes=-1, temp=-1, stopping_temperature=-1, history=None, neighbors=10, dist_matrix=None, metric=None,
+                 schedule="adaptive", epoch=None, patience=20, reheat_after=5, reheat_factor=3.0, tol=1e-6, verbose=False,
+                 target_gap=None, freeze=0.02):
+        self.coords = np.asarray(coordinates, dtype=np.float64)
         self.place = place
         self.N = len(coordinates)
-        self.stopping_temperature = 1e-8
-        self.temp = 1000
+        # metric(c0, c1) gives distances between coordinate arrays (Euclidean by default)
+        self.metric = metric if metric is not None else self.euclidean
+        if dist_matrix is None and self.N <= MATRIX_LIMIT:
+            dist_matrix = self.metric(self.coords[:, None, :], self.coords[None, :, :])
+        self.dist_matrix = dist_matrix
+        # k-nearest candidate lists; moves then join a city to a nearby one
+        self.index = SpatialIndex(self.coords)
+        self.candidates = self.index.neighbors(neighbors) if neighbors else None
+        self.stopping_temperature = stopping_temperature if stopping_temperature > 0 else 1e-8
+        # None means calibrated from sampled moves (adaptive) or 1000 (geometric)
+        self.temp = temp if temp > 0 else None
+        if schedule not in ("adaptive", "geometric"):
+            raise ValueError("schedule must be 'adaptive' or 'geometric', got %r" % schedule)
+        self.schedule = schedule
+        self.epoch = epoch if epoch else max(100, 10 * self.N)
+        self.patience = patience
+        self.reheat_after = reheat_after
+        self.reheat_factor = reheat_factor
+        self.tol = tol
+        self.verbose = verbose
+        # an epoch accepting fewer than `freeze` of its moves counts as frozen;
+        # only frozen epochs can be stagnant, trigger a reheat or end the run
+        self.freeze = freeze
+        self.stale_epochs = 0
+        self.frozen_since_best = 0
+        self.chain_best = float("Inf")
+        self.best_seen = float("Inf")
+        self.telemetry = []
+        # Held-Karp bound; with target_gap the run stops once best_cost is
+        # within that fraction of it
+        self.target_gap = target_gap
+        self.lower_bound = None
         self.stopping_iter = stopping_iter
         self.iteration = 1
         self.nodes = [i for i in range(self.N)]
         self.best_path = None
         self.best_cost = float("Inf")
-        self.cost_list = []
-        self.path_history = []
+        # Bounded tour/cost history; defaults to a reservoir of animation frames
+        self.history = history if history is not None else HistoryRecorder("reservoir")
+
+# Euclidean distances between coordinate arrays; broadcasting over a
+# (N, 1, 2) and a (1, N, 2) array gives the full matrix in one pass.
+    @staticmethod
+    def euclidean(c0, c1):
+        diff = c0 - c1
+        return np.hypot(diff[..., 0], diff[..., 1])
 
 # Total cost of the current path.
     def path_cost(self, solution):
-        cost = 0
-        for i in range(self.N):
-            cost += self.dist(solution[i % self.N], solution[(i + 1) % self.N])
-        return cost
+        path = np.asarray(solution)
+        return float(self.dist(path, np.roll(path, -1)).sum())
 
 
-# Euclidean distance between two nodes.
+# Euclidean distance between two nodes (or arrays of nodes).
 
     def dist(self, node0, node1):
-        coord0, coord1 = self.coords[node0], self.coords[node1]
-        distance = math.sqrt(
-            ((coord0[0] - coord1[0]) ** 2) + ((coord0[1] - coord1[1]) ** 2))
-        return distance
+        if self.dist_matrix is not None:
+            return self.dist_matrix[node0, node1]
+        return self.metric(self.coords[node0], self.coords[node1])
 
-    def accept(self, candidate):
-        candidate_cost = self.path_cost(candidate)
+# Cost change of reversing current_path[i..j]: only the two boundary edges
+# (a, b) and (c, d) are replaced by (a, c) and (b, d).
+    def reversal_delta(self, i, j):
+        path, d = self.current_path, self.dist
+        a, b = path[i - 1], path[i]
+        c, e = path[j], path[(j + 1) % self.N]
+        return float(d(a, c) + d(b, e) - d(a, b) - d(c, e))
 
-# Accept with probability 1 if candidate is better then currrent
+# Reverse current_path[i..j] in place. Reversing the complementary side
+# instead gives the same cycle, so the shorter of the two is flipped and at
+# most N/2 entries of the path and position arrays are touched.
+    def apply_reversal(self, i, j):
+        path = self.current_path
+        if 2 * (j - i + 1) <= self.N:
+            path[i:j + 1] = path[i:j + 1][::-1]
+            self.position[path[i:j + 1]] = np.arange(i, j + 1)
+        else:
+            side = np.arange(j + 1, i + self.N) % self.N
+            path[side] = path[side[::-1]]
+            self.position[path[side]] = side
 
-        if candidate_cost < self.best_cost:
-            self.best_cost = candidate_cost
-            self.best_path = candidate
+# Propose a 2-opt move as a segment (i, j). With candidate lists, pick a city
+# and one of its near neighbours and reverse so that the two become adjacent.
+# Draws that change nothing (j <= i, or a segment of N - 1 cities, which only
+# flips the direction of the tour) are redrawn; below 4 cities every tour is
+# the same cycle and the no-op (0, 0) is returned.
+    def propose(self):
+        if self.N < 4:
+            return 0, 0
+        while True:
+            i, j = self.draw_segment()
+            if 0 < j - i < self.N - 2:
+                return i, j
 
-        else:
-            # Probabily of accepting if candidate is worst than current.
-            #  Prabability = 𝑒^(-𝛥𝐸/T)
-            probability_accept = math.exp(-abs(candidate_cost -
-                                               self.current_cost)/self.temp)
-            if random.random() < probability_accept:
-                self.current_cost = candidate_cost
-                self.current_path = candidate
+    def draw_segment(self):
+        if self.candidates is None or self.candidates.shape[1] == 0:
+            l = random.randint(2, self.N - 1)
+            i = random.randint(0, self.N - 1)
+            return i, min(i + l, self.N) - 1
+        p = random.randrange(self.N)
+        c = self.candidates[self.current_path[p], random.randrange(self.candidates.shape[1])]
+        q = int(self.position[c])
+        if p < q:
+            return p + 1, q
+        return q + 1, p
+
+    def accept(self, i, j):
+        delta = self.reversal_delta(i, j)
+
+# Accept with probability 1 if candidate is better then currrent, otherwise
+# with probability 𝑒^(-𝛥𝐸/T). Returns 𝛥𝐸 when the move is taken, else None.
 
+        if delta <= 0 or random.random() < math.exp(-delta / self.temp):
+            self.apply_reversal(i, j)
+            self.current_cost += delta
+            if self.current_cost < self.best_cost:
+                self.best_cost = self.current_cost
+                self.best_path = self.current_path.copy()
+            return delta
+        return None
 
-# Greedy solution(nearest neighbuor)
+
+# Greedy solution(nearest neighbuor), driven by the KD-tree
 
 
     def intial_solution(self):
-        current_node = random.choice(self.nodes)
-        path = [current_node]
-        remaining_node = set(self.nodes)
-        remaining_node.remove(current_node)
-        while remaining_node:
-            next_node = min(
-                remaining_node, key=lambda x: self.dist(current_node, x))
-            current_node = next_node
-            remaining_node.remove(current_node)
-            path.append(current_node)
+        path = self.index.greedy_tour(random.choice(self.nodes))
         initial_cost = self.path_cost(path)
         if(self.best_cost > initial_cost):
             self.best_cost = initial_cost
             self.best_path = path
-        self.cost_list.append(initial_cost)
-        self.path_history.append(path)
+        self.history.record(0, path, initial_cost)
         return path, initial_cost
 
+# Make path the chain's current tour, held as an int array.
+    def set_state(self, path, cost):
+        self.current_path, self.current_cost = np.array(path, dtype=np.int64), cost
+        self.position = np.empty(self.N, dtype=np.int64)
+        self.position[self.current_path] = np.arange(self.N)
+
+# Metropolis steps at the fixed temperature self.temp; returns accepted moves.
+    def metropolis(self, steps):
+        accepted = 0
+        for _ in range(steps):
+            if self.accept(*self.propose()) is not None:
+                accepted += 1
+        return accepted
+
+# Starting temperature at which about `target` of sampled uphill moves are
+# accepted: T0 = -mean(𝛥𝐸+) / ln(target).
+    def calibrate_temperature(self, samples=200, target=0.8):
+        uphill = [d for d in (self.reversal_delta(*self.propose()) for _ in range(samples)) if d > 0]
+        mean = np.mean(uphill) if uphill else self.current_cost / self.N
+        return -mean / math.log(target)
+
+# Adaptive schedule, applied once per epoch: cool fast while nearly every move
+# is accepted, slowly near freezing. Once frozen, reheat from the best tour
+# after reheat_after stagnant epochs, and report convergence after patience
+# frozen epochs without a new best tour. Returns True when converged.
+    def end_epoch(self, accepted, improved, epoch_low):
+        acceptance = accepted / self.epoch
+        frozen = acceptance < self.freeze
+        # stagnation: the chain's lowest cost stopped falling while frozen
+        if epoch_low < self.chain_best * (1 - self.tol):
+            self.chain_best = epoch_low
+            self.stale_epochs = 0
+        elif frozen:
+            self.stale_epochs += 1
+        if self.best_cost < self.best_seen * (1 - self.tol):
+            self.best_seen = self.best_cost
+            self.frozen_since_best = 0
+        elif frozen:
+            self.frozen_since_best += 1
+        converged = frozen and self.frozen_since_best >= self.patience
+
+        reheated = False
+        if frozen and not converged and self.stale_epochs >= self.reheat_after:
+            self.temp = min(self.initial_temp, self.temp * self.reheat_factor)
+            self.set_state(self.best_path, self.best_cost)
+            self.chain_best = self.best_cost
+            self.stale_epochs = 0
+            reheated = True
+        elif acceptance > 0.6:
+            self.temp *= 0.8
+        elif acceptance > 0.1:
+            self.temp *= 0.95
+        else:
+            self.temp *= 0.99
+
+        self.telemetry.append({"epoch": len(self.telemetry) + 1, "iteration": self.iteration, "temp": self.temp,
+                               "acceptance": acceptance, "improvement": improved / self.epoch,
+                               "best_cost": self.best_cost, "reheated": reheated})
+        if self.verbose:
+            print("epoch %(epoch)d  iter %(iteration)d  T=%(temp).4g  accept=%(acceptance).3f  "
+                  "improve=%(improvement).3f  best=%(best_cost).6g%(flag)s"
+                  % dict(self.telemetry[-1], flag="  (reheat)" if reheated else ""))
+        return converged
+
+# Final cold quench: restart from the best tour and keep only non-worsening
+# moves, epoch by epoch, until an epoch no longer improves it.
+    def quench(self):
+        self.set_state(self.best_path, self.best_cost)
+        self.temp = min(self.temp, self.stopping_temperature)
+        while True:
+            before = self.best_cost
+            self.metropolis(self.epoch)
+            self.iteration += self.epoch
+            if self.best_cost >= before * (1 - self.tol):
+                break
+        self.history.record(self.iteration, self.best_path, self.best_cost)
+
 # Simulated annealing algorithm
     def simulated_annealing(self):
-        self.current_path, self.current_cost = self.intial_solution()
+        self.set_state(*self.intial_solution())
+        if self.schedule == "adaptive" and self.temp is None:
+            self.temp = self.calibrate_temperature()
+        elif self.temp is None:
+            self.temp = 1000
+        self.initial_temp = self.temp
+        gap_cost = -float("Inf")
+        if self.target_gap is not None:
+            gap_cost = self.compute_lower_bound() * (1 + self.target_gap)
+        accepted = improved = 0
+        epoch_low = float("Inf")
         while self.temp >= self.stopping_temperature and self.iteration < self.stopping_iter:
-            candidate = list(self.current_path)
-            l = random.randint(2, self.N - 1)
-            i = random.randint(0, self.N - 1)
-            candidate[i:(i+l)] = reversed(candidate[i:(i+l)])
-            self.accept(candidate)
+            delta = self.accept(*self.propose())
+            if delta is not None:
+                accepted += 1
+                if delta < 0:
+                    improved += 1
+                    epoch_low = min(epoch_low, self.current_cost)
 
-#           taking alpha = 0.9995
-            self.temp *= 0.9995
             self.iteration += 1
-            self.cost_list.append(self.current_cost)
-            self.path_history.append(self.current_path)
+            self.history.record(self.iteration, self.current_path, self.current_cost)
+            if self.best_cost <= gap_cost:
+                break
+            if self.schedule == "geometric":
+                #   taking alpha = 0.9995
+                self.temp *= 0.9995
+            elif self.iteration % self.epoch == 0:
+                if self.end_epoch(accepted, improved, epoch_low):
+                    break
+                accepted = improved = 0
+                epoch_low = float("Inf")
+        if self.best_cost > gap_cost:
+            self.quench()
         print("Best cost obtained:", self.best_cost)
+        if self.lower_bound is not None:
+            gap = self.gap()
+            print("Held-Karp bound: %s%s" % (self.lower_bound, "" if gap is None else " (gap %.2f%%)" % (100 * gap)))
 
     def display_optimal_path(self):
         n = len(self.best_path)
@@ -102,19 +279,46 @@ class SimAnneal():
         tour += self.place[self.best_path[0]]
         print("Optimal Path :", tour)
 
-# Animated visualization of TSP
-    def animateSolutions(self):
+# Animated visualization of TSP; with a filename (.mp4/.gif) the animation
+# is rendered offline instead, optionally in a background process.
+    def animateSolutions(self, filename=None, background=False):
+        if filename is None:
+            animated_visualizer.animateTSP(self.history, self.coords)
+            return None
+        return animated_visualizer.renderTSP(self.history, self.coords, filename, background=background)
+
+# Held-Karp 1-tree bound, using the best tour so far as the subgradient target.
+    def compute_lower_bound(self, iterations=500):
+        if self.dist_matrix is None:
+            raise ValueError("the Held-Karp bound needs the distance matrix (N <= MATRIX_LIMIT)")
+        self.lower_bound = held_karp_bound(self.dist_matrix, self.best_cost, iterations)
+        return self.lower_bound
 
-        animated_visualizer.animateTSP(self.path_history, self.coords)
+# Relative distance of best_cost above the lower bound; None when there is no
+# bound or it is not positive (the ratio is undefined).
+    def gap(self):
+        if self.lower_bound is None or self.lower_bound <= 0:
+            return None
+        return (self.best_cost - self.lower_bound) / self.lower_bound
 
 #  Plot the fitness through iterations.
     def plot_learning(self):
-        initial_cost = self.cost_list[0]
-        plt.plot([i for i in range(len(self.cost_list))], self.cost_list)
+        costs = self.history.costs
+        if len(costs) == 0:
+            raise ValueError("no history recorded; use a HistoryRecorder mode other than 'off'")
+        initial_cost = costs[0]
+        plt.plot(self.history.iterations, costs)
         line_init = plt.axhline(y=initial_cost, color='r', linestyle='--')
         line_min = plt.axhline(y=self.best_cost, color='g', linestyle='--')
-        plt.title("Learning progress")
-        plt.legend([line_init, line_min], ['Initial Cost', 'Optimized Cost'])
+        lines, labels = [line_init, line_min], ['Initial Cost', 'Optimized Cost']
+        title = "Learning progress"
+        if self.lower_bound is not None:
+            lines.append(plt.axhline(y=self.lower_bound, color='k', linestyle=':'))
+            labels.append('Held-Karp Bound')
+            if self.gap() is not None:
+                title += " (gap %.2f%%)" % (100 * self.gap())
+        plt.title(title)
+        plt.legend(lines, labels)
         plt.ylabel("Cost")
         plt.xlabel("Iteration")
         plt.show()
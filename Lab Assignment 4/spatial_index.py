@@ -0,0 +1,45 @@
+import numpy as np
+from scipy.spatial import cKDTree
+
+
+class SpatialIndex():
+    """KD-tree over city coordinates for construction and move proposals."""
+
+    def __init__(self, coords):
+        self.coords = np.asarray(coords, dtype=np.float64)
+        self.N = len(self.coords)
+        self.tree = cKDTree(self.coords)
+
+# k nearest cities of every city (excluding itself), shape (N, k).
+    def neighbors(self, k):
+        k = min(k, self.N - 1)
+        if k <= 0:
+            return np.empty((self.N, 0), dtype=np.int64)
+        _, idx = self.tree.query(self.coords, k=k + 1)
+        # drop the self match; duplicates may put it in any column
+        own = idx == np.arange(self.N)[:, None]
+        own[own.sum(axis=1) == 0, -1] = True
+        return idx[~own].reshape(self.N, k)
+
+# Nearest-neighbour tour: each step asks the tree for a growing number of
+# nearest cities until an unvisited one appears.
+    def greedy_tour(self, start):
+        visited = np.zeros(self.N, dtype=bool)
+        path = [start]
+        visited[start] = True
+        current = start
+        k = 8
+        for _ in range(self.N - 1):
+            while True:
+                k_eff = min(k, self.N)
+                _, idx = self.tree.query(self.coords[current], k=k_eff)
+                idx = np.atleast_1d(idx)
+                free = idx[~visited[idx]]
+                if len(free) or k_eff == self.N:
+                    break
+                k *= 2
+            current = int(free[0])
+            visited[current] = True
+            path.append(current)
+            k = max(8, k // 2)
+        return path
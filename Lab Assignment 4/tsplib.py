@@ -0,0 +1,221 @@
+import io
+import os
+import re
+import numpy as np
+
+
+# Edge weight types computed from NODE_COORD_SECTION, following the TSPLIB
+# rounding rules. GEOM is Concorde's great-circle norm on decimal degrees
+# (metres), used for plain latitude/longitude files.
+COORD_TYPES = ("EUC_2D", "CEIL_2D", "ATT", "GEO", "GEOM")
+EXPLICIT_FORMATS = ("FULL_MATRIX", "UPPER_ROW", "LOWER_ROW", "UPPER_DIAG_ROW", "LOWER_DIAG_ROW",
+                    "UPPER_COL", "LOWER_COL", "UPPER_DIAG_COL", "LOWER_DIAG_COL")
+SECTIONS = ("NODE_COORD_SECTION", "EDGE_WEIGHT_SECTION", "DISPLAY_DATA_SECTION")
+
+
+class TSPInstance():
+    def __init__(self, name, kind, coords, names, dist_matrix):
+        self.name = name
+        self.kind = kind
+        self.dimension = len(names)
+        self.coords = coords
+        self.names = names
+        self.dist_matrix = dist_matrix
+
+# Distances between coordinate arrays c0 and c1 (broadcast) for this instance.
+    def metric(self, c0, c1):
+        return pair_distance(self.kind, c0, c1)
+
+
+def euc_2d(c0, c1):
+    return np.rint(np.hypot(c0[..., 0] - c1[..., 0], c0[..., 1] - c1[..., 1]))
+
+
+def ceil_2d(c0, c1):
+    return np.ceil(np.hypot(c0[..., 0] - c1[..., 0], c0[..., 1] - c1[..., 1]))
+
+
+def att(c0, c1):
+    r = np.sqrt(((c0[..., 0] - c1[..., 0]) ** 2 + (c0[..., 1] - c1[..., 1]) ** 2) / 10.0)
+    t = np.rint(r)
+    return np.where(t < r, t + 1, t)
+
+
+# TSPLIB GEO: coordinates are DDD.MM (degrees and minutes).
+def geo_radians(x):
+    deg = np.trunc(x)
+    return 3.141592 * (deg + 5.0 * (x - deg) / 3.0) / 180.0
+
+
+def geo(c0, c1):
+    lat0, lon0 = geo_radians(c0[..., 0]), geo_radians(c0[..., 1])
+    lat1, lon1 = geo_radians(c1[..., 0]), geo_radians(c1[..., 1])
+    q1 = np.cos(lon0 - lon1)
+    q2 = np.cos(lat0 - lat1)
+    q3 = np.cos(lat0 + lat1)
+    arc = np.arccos(np.clip(0.5 * ((1.0 + q1) * q2 - (1.0 - q1) * q3), -1.0, 1.0))
+    return np.where(arc > 0, np.trunc(6378.388 * arc + 1.0), 0.0)
+
+
+def geom(c0, c1):
+    lat0, lon0 = np.radians(c0[..., 0]), np.radians(c0[..., 1])
+    lat1, lon1 = np.radians(c1[..., 0]), np.radians(c1[..., 1])
+    dlon = lon0 - lon1
+    q1 = np.cos(lat1) * np.sin(dlon)
+    q3 = np.sin(dlon / 2.0)
+    q4 = np.cos(dlon / 2.0)
+    q2 = np.sin(lat0 + lat1) * q3 * q3 - np.sin(lat0 - lat1) * q4 * q4
+    q5 = np.cos(lat0 - lat1) * q4 * q4 - np.cos(lat0 + lat1) * q3 * q3
+    arc = np.arctan2(np.sqrt(q1 * q1 + q2 * q2), q5)
+    return np.where(arc > 0, np.trunc(6378388.0 * arc + 1.0), 0.0)
+
+
+METRICS = {"EUC_2D": euc_2d, "CEIL_2D": ceil_2d, "ATT": att, "GEO": geo, "GEOM": geom}
+
+
+def pair_distance(kind, c0, c1):
+    if kind not in METRICS:
+        raise ValueError("no coordinate metric for EDGE_WEIGHT_TYPE %s" % kind)
+    return METRICS[kind](np.asarray(c0, dtype=np.float64), np.asarray(c1, dtype=np.float64))
+
+
+# Header keywords up to the first data section. Reads line by line so a
+# cached load never touches the body; returns the header and the name of
+# the section the body starts with (None when the file has no data).
+def read_header(infile):
+    header = {}
+    for line in iter(infile.readline, ""):
+        key = line.split(":")[0].strip()
+        if key in SECTIONS:
+            return header, key
+        if key == "EOF":
+            break
+        if ":" in line:
+            header[key] = line.split(":", 1)[1].strip()
+    return header, None
+
+
+SECTION_LINE = re.compile(r"^[ \t]*(%s|EOF)\b.*$" % "|".join(SECTIONS), re.M)
+
+
+# Text of each data section of body, which starts inside section `first`.
+# Boundaries are found with one regex scan instead of a loop over lines.
+def split_sections(first, body):
+    sections = {}
+    current, start = first, 0
+    for match in SECTION_LINE.finditer(body):
+        sections[current] = body[start:match.start()]
+        if match.group(1) == "EOF":
+            return sections
+        current, start = match.group(1), match.end()
+    sections[current] = body[start:]
+    return sections
+
+
+# Bulk-parse "id x y" rows with np.loadtxt, reading only the first three
+# tokens of each row; ids may be place names rather than numbers.
+def parse_coords(section, n, name="NODE_COORD_SECTION"):
+    try:
+        try:
+            table = np.loadtxt(io.StringIO(section), usecols=(0, 1, 2), max_rows=n, ndmin=2)
+            coords, names = table[:, 1:3], [str(i) for i in table[:, 0].astype(np.int64).tolist()]
+        except ValueError:
+            coords = np.loadtxt(io.StringIO(section), usecols=(1, 2), max_rows=n, ndmin=2)
+            names = np.loadtxt(io.StringIO(section), usecols=0, dtype=str, max_rows=n, ndmin=1).tolist()
+    except ValueError:
+        rows = [line for line in section.splitlines() if line.strip()][:n]
+        for row, line in enumerate(rows, 1):
+            if len(line.split()) < 3:
+                raise ValueError("%s row %d: expected 'id x y', got %r" % (name, row, line.strip()))
+        raise
+    if len(coords) < n:
+        raise ValueError("%s has %d rows, DIMENSION is %d" % (name, len(coords), n))
+    return coords, names
+
+
+def explicit_matrix(section, n, fmt):
+    values = np.array(section.split(), dtype=np.float64)
+    if fmt == "FULL_MATRIX":
+        return values[:n * n].reshape(n, n)
+    # column-wise formats enumerate the opposite triangle row by row
+    fmt = {"UPPER_COL": "LOWER_ROW", "LOWER_COL": "UPPER_ROW",
+           "UPPER_DIAG_COL": "LOWER_DIAG_ROW", "LOWER_DIAG_COL": "UPPER_DIAG_ROW"}.get(fmt, fmt)
+    if fmt.startswith("UPPER"):
+        rows, cols = np.triu_indices(n, k=0 if "DIAG" in fmt else 1)
+    else:
+        rows, cols = np.tril_indices(n, k=0 if "DIAG" in fmt else -1)
+    matrix = np.zeros((n, n), dtype=np.float64)
+    matrix[rows, cols] = values[:len(rows)]
+    matrix[cols, rows] = values[:len(rows)]
+    return matrix
+
+
+def cache_paths(path):
+    return {part: "%s.%s.npy" % (path, part) for part in ("coords", "names", "dist")}
+
+
+def cache_fresh(cache_file, source):
+    return os.path.exists(cache_file) and os.path.getmtime(cache_file) >= os.path.getmtime(source)
+
+
+# Caching is best effort: a read-only data directory just means no cache.
+def save_cache(cache_file, array):
+    try:
+        np.save(cache_file, array)
+    except OSError:
+        pass
+
+
+# Load a TSPLIB file. The distance matrix is built (and cached) only for
+# EXPLICIT instances or when the dimension is at most max_matrix. When every
+# cache needed is fresh only the header is read.
+def read_tsp(path, max_matrix=5000, cache=True):
+    with open(path, "r") as infile:
+        header, first = read_header(infile)
+        name = header.get("NAME", os.path.basename(path))
+        n = int(header["DIMENSION"])
+        kind = header.get("EDGE_WEIGHT_TYPE", "EUC_2D")
+        if kind != "EXPLICIT" and kind not in COORD_TYPES:
+            raise ValueError("unsupported EDGE_WEIGHT_TYPE %s" % kind)
+        files = cache_paths(path)
+        want_matrix = kind == "EXPLICIT" or n <= max_matrix
+        coords_cached = cache and cache_fresh(files["coords"], path) and cache_fresh(files["names"], path)
+        dist_cached = cache and want_matrix and cache_fresh(files["dist"], path)
+        sections = {}
+        if not (coords_cached and (dist_cached or not want_matrix)):
+            sections = split_sections(first, infile.read()) if first is not None else {}
+
+    coords, names = None, None
+    if coords_cached:
+        coords = np.load(files["coords"])
+        names = np.load(files["names"]).tolist()
+    else:
+        coord_name = "NODE_COORD_SECTION" if "NODE_COORD_SECTION" in sections else "DISPLAY_DATA_SECTION"
+        if coord_name in sections:
+            coords, names = parse_coords(sections[coord_name], n, coord_name)
+            if cache:
+                save_cache(files["coords"], coords)
+                save_cache(files["names"], np.array(names))
+    if coords is None and kind != "EXPLICIT":
+        raise ValueError("%s has no NODE_COORD_SECTION" % path)
+    if names is None:
+        names = [str(i + 1) for i in range(n)]
+
+    dist_matrix = None
+    if want_matrix:
+        if dist_cached:
+            dist_matrix = np.load(files["dist"])
+        else:
+            if kind == "EXPLICIT":
+                fmt = header.get("EDGE_WEIGHT_FORMAT", "FULL_MATRIX")
+                if fmt not in EXPLICIT_FORMATS:
+                    raise ValueError("unsupported EDGE_WEIGHT_FORMAT %s" % fmt)
+                if "EDGE_WEIGHT_SECTION" not in sections:
+                    raise ValueError("%s has no EDGE_WEIGHT_SECTION" % path)
+                dist_matrix = explicit_matrix(sections["EDGE_WEIGHT_SECTION"], n, fmt)
+            else:
+                dist_matrix = pair_distance(kind, coords[:, None, :], coords[None, :, :])
+            if cache:
+                save_cache(files["dist"], dist_matrix)
+
+    return TSPInstance(name, kind, coords, names, dist_matrix)